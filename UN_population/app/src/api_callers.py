@@ -1,15 +1,109 @@
+from itertools import islice
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import os
 import streamlit as st
+import orjson
+
+
+BASE_API_URL = "https://population.un.org/dataportalapi/api/v1"
+
+
+def _parse_json(response):
+    """Decode a JSON response body with orjson"""
+    return orjson.loads(response.content)
+
+
+def _create_session():
+    """Create a requests session with pooled, retrying connections to the API"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(total=3, backoff_factor=0.3,
+                          status_forcelist=(429, 500, 502, 503, 504), raise_on_status=False)
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class UnauthorizedError(Exception):
+    """Raised when the UN Population API rejects the API key"""
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_indicators(_session, api_key):
+    """Fetch the indicator name -> id mapping, cached per API key"""
+    url = f"{BASE_API_URL}/indicators"
+    print(f"[API CALL] Requesting indicators from: {url}")
+
+    headers = {"Authorization": f"Bearer {api_key}"}
+    response = _session.get(url, headers=headers)
+
+    if response.status_code == 200:
+        indicators_data = _parse_json(response)
+        return {indicator['name']: indicator['id']
+                for indicator in indicators_data.get('data', [])}
+    elif response.status_code == 401:
+        raise UnauthorizedError()
+    else:
+        raise Exception(
+            f"Error fetching indicators: {response.status_code}")
+
+
+@st.cache_data(ttl=1800, show_spinner=False)
+def _fetch_indicator_data(_session, api_key, indicator_id, locations_tuple):
+    """Fetch the data for an indicator as a DataFrame, cached per indicator and locations"""
+    url = f"{BASE_API_URL}/data/indicators/{indicator_id}/locations/900"
+
+    if locations_tuple:
+        url = f"{BASE_API_URL}/data/indicators/{indicator_id}/locations/{','.join(map(str, locations_tuple))}"
+
+    print(
+        f"[API CALL] Requesting data for indicator ID {indicator_id}: {url}")
+
+    headers = {"Authorization": f"Bearer {api_key}"}
+    response = _session.get(url, headers=headers)
+
+    if response.status_code == 200:
+        data = _parse_json(response)
+
+        if not data.get('data'):
+            return pd.DataFrame()
+
+        df = pd.json_normalize(data['data']).reindex(
+            columns=['timeLabel', 'value', 'location.name', 'variant.name']
+        ).rename(columns={'timeLabel': 'year', 'location.name': 'location', 'variant.name': 'variant'})
+
+        df[['location', 'variant']] = df[['location', 'variant']].fillna('Unknown')
+        # Period labels such as "1950-1955" are placed at their start year
+        df['year'] = pd.to_numeric(df['year'].astype(str).str.extract(
+            r'^(\d{4})', expand=False), errors='coerce')
+
+        missing_year = df['year'].isna()
+        if missing_year.any():
+            print(
+                f"[WARNING] Dropping {missing_year.sum()} rows without a year for indicator ID {indicator_id}")
+            df = df[~missing_year]
+
+        return df.astype({'year': 'int16', 'value': 'float64'}).reset_index(drop=True)
+    elif response.status_code == 401:
+        raise UnauthorizedError()
+    else:
+        raise Exception(f"{response.status_code}")
 
 
 class UN_Population:
     def __init__(self):
-        self.base_api_url = "https://population.un.org/dataportalapi/api/v1"
+        self.base_api_url = BASE_API_URL
         self.df = None
         self.df_cleaned = None
         self.api_key = os.environ.get("UN_POPULATION_API_KEY")
+        self.session = _create_session()
 
     def _get_api_key(self):
         """Get API key from session state or prompt user for it"""
@@ -47,10 +141,10 @@ class UN_Population:
         print(f"[API CALL] Requesting indicators from: {url}")
 
         headers = {"Authorization": f"Bearer {api_key}"}
-        response = requests.get(url, headers=headers)
+        response = self.session.get(url, headers=headers)
 
         if response.status_code == 200:
-            return response.json()
+            return _parse_json(response)
         elif response.status_code == 401:
             st.error(
                 "Unauthorized: Invalid API key. Please check your API key and try again.")
@@ -61,14 +155,17 @@ class UN_Population:
                 f"Error fetching indicators: {response.status_code}")
 
     def get_indicator_names(self):
-        """Extract a list of indicator names from the API response"""
-        indicators_data = self.get_indicators()
+        """Extract a dict of indicator names to ids, cached across calls"""
+        api_key = self._check_api_key_input()
+        if not api_key:
+            return {}
 
-        if 'data' in indicators_data:
-            indicator_dict = {indicator['name']: indicator['id']
-                              for indicator in indicators_data['data']}
-            return indicator_dict
-        else:
+        try:
+            return _fetch_indicators(self.session, api_key)
+        except UnauthorizedError:
+            st.error(
+                "Unauthorized: Invalid API key. Please check your API key and try again.")
+            st.session_state.un_api_key = None
             return {}
 
     def get_available_targets(self):
@@ -81,10 +178,10 @@ class UN_Population:
         print(f"[API CALL] Requesting targets from: {url}")
 
         headers = {"Authorization": f"Bearer {api_key}"}
-        response = requests.get(url, headers=headers)
+        response = self.session.get(url, headers=headers)
 
         if response.status_code == 200:
-            return response.json()
+            return _parse_json(response)
         elif response.status_code == 401:
             st.error(
                 "Unauthorized: Invalid API key. Please check your API key and try again.")
@@ -113,45 +210,13 @@ class UN_Population:
 
             indicator_id = indicators_dict[indicator_name]
 
-            url = f"{self.base_api_url}/data/indicators/{indicator_id}/locations/900"
-
-            if locations:
-                url = f"{self.base_api_url}/data/indicators/{indicator_id}/locations/{','.join(map(str, locations))}"
-
-            print(
-                f"[API CALL] Requesting data for indicator ID {indicator_id}: {url}")
-
-            headers = {"Authorization": f"Bearer {api_key}"}
-            response = requests.get(url, headers=headers)
-
-            if response.status_code == 200:
-                data = response.json()
-
-                if 'data' in data:
-                    records = []
-                    for item in data['data']:
-                        record = {
-                            'year': item.get('timeLabel'),
-                            'value': item.get('value'),
-                            'location': item.get('location', {}).get('name', 'Unknown'),
-                            'variant': item.get('variant', {}).get('name', 'Unknown')
-                        }
-                        records.append(record)
-
-                    df = pd.DataFrame(records)
-
-                    df['year'] = pd.to_numeric(df['year'], errors='ignore')
-
-                    return df
-                else:
-                    return pd.DataFrame()
-            elif response.status_code == 401:
-                st.error(
-                    "Unauthorized: Invalid API key. Please check your API key and try again.")
-                st.session_state.un_api_key = None
-                return pd.DataFrame()
-            else:
-                raise Exception(f"{response.status_code}")
+            return _fetch_indicator_data(
+                self.session, api_key, indicator_id, tuple(locations) if locations else None)
+        except UnauthorizedError:
+            st.error(
+                "Unauthorized: Invalid API key. Please check your API key and try again.")
+            st.session_state.un_api_key = None
+            return pd.DataFrame()
         except Exception as e:
             raise Exception(f"Error fetching data for {indicator_name}: {e}")
 
@@ -173,17 +238,15 @@ class UN_Population:
 
             url = f"{self.base_api_url}/data/indicators/{indicator_id}/locations/900"
             headers = {"Authorization": f"Bearer {api_key}"}
-            response = requests.get(url, headers=headers)
+            response = self.session.get(url, headers=headers)
 
             if response.status_code == 200:
-                data = response.json()
+                data = _parse_json(response)
                 if 'data' in data and data['data']:
-                    location_ids = set()
-                    for item in data['data']:
-                        if 'location' in item and 'id' in item['location']:
-                            location_ids.add(item['location']['id'])
+                    location_ids = {item['location']['id'] for item in data['data']
+                                    if 'location' in item and 'id' in item['location']}
 
-                    return list(location_ids)[:limit]
+                    return list(islice(location_ids, limit))
                 else:
                     return [900]
             elif response.status_code == 401:
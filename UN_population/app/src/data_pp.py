@@ -1,3 +1,126 @@
+import math
+
 import pandas as pd
 import numpy as np
+from numba import njit
+
+# Upper bound on points sent to the browser per trace (roughly one per pixel)
+MAX_POINTS_PER_TRACE = 2000
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling
+
+    Args:
+        x (np.ndarray): Sorted x values
+        y (np.ndarray): y values matching x
+        n_out (int): Number of points to keep
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # First and last points are always kept, the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = np.nanmean(x[end:next_end])
+        avg_y = np.nanmean(y[end:next_end])
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) -
+                      (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(np.nan_to_num(area)))
+        indices[i + 1] = a
+
+    return indices
+
+
+def downsample_traces(df, x="year", y="value", by=None, max_points=MAX_POINTS_PER_TRACE):
+    """Downsample each line trace of a DataFrame to at most max_points points with LTTB
+
+    LTTB assumes one y per x, so the frame is returned unchanged when any trace has
+    repeated x values (e.g. several variants or age groups per year).
+
+    Args:
+        df (pd.DataFrame): Data to plot
+        x (str, optional): Column on the x axis. Defaults to "year".
+        y (str, optional): Column on the y axis. Defaults to "value".
+        by (str | list, optional): Column(s) identifying a trace. Defaults to None.
+        max_points (int, optional): Points to keep per trace. Defaults to MAX_POINTS_PER_TRACE.
+    """
+    if len(df) <= max_points:
+        return df
+
+    keys = ([by] if isinstance(by, str) else list(by or [])) + [x]
+    if df.duplicated(subset=keys).any():
+        return df
+
+    groups = df.groupby(by, sort=False) if by else [(None, df)]
+
+    sampled = []
+    for _, trace in groups:
+        trace = trace.sort_values(x)
+        idx = lttb_indices(trace[x].to_numpy(dtype=float),
+                           trace[y].to_numpy(dtype=float), max_points)
+        sampled.append(trace.iloc[idx])
+
+    return pd.concat(sampled)
+
+
+def bucket_by_year(df, by, target_rows, x="year", columns=("value",)):
+    """Average rows into equal-width year buckets so each series keeps about target_rows in total
+
+    The bucket width is ceil(n_years * n_series / target_rows) years, clamped to the year
+    span, so the output size follows the number of series rather than the raw row count.
+
+    Args:
+        df (pd.DataFrame): Data to aggregate
+        by (list): Columns identifying a series
+        target_rows (int): Approximate number of rows to return
+        x (str, optional): Year column. Defaults to "year".
+        columns (tuple, optional): Columns to average. Defaults to ("value",).
+
+    Returns:
+        tuple: The aggregated DataFrame and the bucket width in years
+    """
+    first_year = int(df[x].min())
+    n_years = int(df[x].max()) - first_year + 1
+    n_series = len(df.drop_duplicates(subset=by))
+    step = min(max(1, math.ceil(n_years * n_series / target_rows)), n_years)
+
+    # Buckets start at the first year and are labelled by their first year
+    bucket_start = (df[x] - first_year) // step * step + first_year
+    bucketed = df.assign(**{x: bucket_start.astype(df[x].dtype)}).groupby(
+        [*by, x], as_index=False
+    ).agg({column: 'mean' for column in columns})
+    return bucketed, step
+
+
+@njit(cache=True)
+def summarize(years, values):
+    """Latest year, mean value in the latest year, first value and last value in one pass
+
+    Args:
+        years (np.ndarray): Years in row order
+        values (np.ndarray): Values matching years
+    """
+    latest_year = years[0]
+    total = 0.0
+    count = 0
+    for i in range(len(years)):
+        if years[i] > latest_year:
+            latest_year = years[i]
+            total = 0.0
+            count = 0
+        if years[i] == latest_year and not np.isnan(values[i]):
+            total += values[i]
+            count += 1
 
+    # NaN rather than a warning when every value of the latest year is missing
+    latest_mean = total / count if count > 0 else np.nan
+    return latest_year, latest_mean, values[0], values[-1]
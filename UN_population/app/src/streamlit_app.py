@@ -1,4 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -7,6 +10,11 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 from api_callers import UN_Population
+from data_pp import bucket_by_year, downsample_traces, summarize
+
+# Comparative data larger than this is averaged into year buckets before plotting
+COMPARATIVE_MAX_ROWS = 50_000
+COMPARATIVE_TARGET_ROWS = 20_000
 
 st.set_page_config(
     page_title="UN Population Data Visualization",
@@ -64,16 +72,21 @@ st.markdown(
 )
 
 if 'all_indicators' not in st.session_state:
+    # Kept across reruns so its HTTP session (and open connections) is reused
+    st.session_state.un_client = UN_Population()
     with st.spinner("Loading indicators from UN Population API..."):
         try:
-            un_population = UN_Population()
-            st.session_state.all_indicators = un_population.get_indicator_names()
+            st.session_state.all_indicators = st.session_state.un_client.get_indicator_names()
             st.session_state.selected_locations = [900]
         except Exception as e:
             st.error(f"Error loading indicators: {str(e)}")
             st.session_state.all_indicators = {}
             st.session_state.selected_locations = [900]
 
+    if isinstance(st.session_state.all_indicators, dict):
+        st.session_state.all_indicators_lower = [
+            (name.lower(), name, id) for name, id in st.session_state.all_indicators.items()]
+
 with st.sidebar:
     st.header("📊 Data Selection")
 
@@ -81,16 +94,22 @@ with st.sidebar:
 
     if not isinstance(st.session_state.all_indicators, dict):
         st.session_state.all_indicators = {}
+        st.session_state.all_indicators_lower = []
         st.error("Failed to load indicators properly. Please refresh the page.")
 
-    filtered_indicators = {
-        name: id for name, id in st.session_state.all_indicators.items() if search_term.lower() in name.lower()}
+    if search_term:
+        search_lc = search_term.lower()
+        filtered_indicators = {
+            name: id for lc, name, id in st.session_state.all_indicators_lower if search_lc in lc}
+    else:
+        filtered_indicators = st.session_state.all_indicators
+
+    indicator_names = list(filtered_indicators)
 
     selected_indicators = st.multiselect(
         "Select indicators to visualize",
-        options=list(filtered_indicators.keys()),
-        default=list(filtered_indicators.keys())[
-            :3] if filtered_indicators else [],
+        options=indicator_names,
+        default=indicator_names[:3],
         key="indicator_selector"
     )
 
@@ -117,6 +136,24 @@ with st.sidebar:
     )
 
 
+def fetch_all_indicators(un_population, indicators):
+    """Fetch data for the indicators concurrently, keyed by indicator name.
+
+    Each value is either the fetched DataFrame or the exception raised while fetching it.
+    """
+    ctx = get_script_run_ctx()
+    locations = tuple(st.session_state.selected_locations)
+
+    def fetch(indicator):
+        try:
+            return un_population.get_data_for_indicator(indicator, locations=locations)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=8, initializer=add_script_run_ctx, initargs=(None, ctx)) as executor:
+        return dict(zip(indicators, executor.map(fetch, indicators)))
+
+
 def fetch_and_visualize(selected_indicators):
     """Fetch and visualize data for the selected indicators"""
     if not selected_indicators:
@@ -124,130 +161,134 @@ def fetch_and_visualize(selected_indicators):
             "👆 Please select at least one indicator from the sidebar to visualize.")
         return
 
-    un_population = UN_Population()
+    un_population = st.session_state.un_client
+
+    with st.spinner("Fetching data for the selected indicators..."):
+        # Warm the indicator cache (and resolve the API key) before the worker threads start
+        un_population.get_indicator_names()
+        indicator_data = fetch_all_indicators(
+            un_population, selected_indicators)
 
     tab1, tab2 = st.tabs(["Individual Indicators", "Comparative View"])
 
     with tab1:
         for indicator in selected_indicators:
-            with st.spinner(f"Fetching data for {indicator}..."):
-                try:
-                    df = un_population.get_data_for_indicator(
-                        indicator, locations=st.session_state.selected_locations)
-
-                    if df.empty:
-                        st.warning(f"No data available for {indicator}")
-                        continue
-
-                    st.markdown(f"### {indicator}")
-
-                    col1, col2 = st.columns([3, 1])
-
-                    with col1:
-                        if chart_type == "Line Chart":
-                            fig = px.line(
-                                df,
-                                x="year",
-                                y="value",
-                                color="location" if len(
-                                    df['location'].unique()) > 1 else None,
-                                markers=True,
-                                title=f"{indicator} Over Time",
-                                labels={"value": "Value", "year": "Year",
-                                        "location": "Location"},
-                                template="plotly_white"
-                            )
-                        elif chart_type == "Bar Chart":
-                            fig = px.bar(
-                                df,
-                                x="year",
-                                y="value",
-                                color="location" if len(
-                                    df['location'].unique()) > 1 else None,
-                                title=f"{indicator} Over Time",
-                                labels={"value": "Value", "year": "Year",
-                                        "location": "Location"},
-                                template="plotly_white"
-                            )
-                        elif chart_type == "Area Chart":
-                            fig = px.area(
-                                df,
-                                x="year",
-                                y="value",
-                                color="location" if len(
-                                    df['location'].unique()) > 1 else None,
-                                title=f"{indicator} Over Time",
-                                labels={"value": "Value", "year": "Year",
-                                        "location": "Location"},
-                                template="plotly_white"
-                            )
-                        else:
-                            fig = px.scatter(
-                                df,
-                                x="year",
-                                y="value",
-                                color="location" if len(
-                                    df['location'].unique()) > 1 else None,
-                                size="value",
-                                title=f"{indicator} Over Time",
-                                labels={"value": "Value", "year": "Year",
-                                        "location": "Location"},
-                                template="plotly_white"
-                            )
-
-                        fig.update_layout(
-                            xaxis=dict(showgrid=show_grid),
-                            yaxis=dict(showgrid=show_grid),
-                            legend=dict(orientation="h", yanchor="bottom",
-                                        y=1.02, xanchor="right", x=1),
-                            height=500,
+            try:
+                df = indicator_data[indicator]
+                if isinstance(df, Exception):
+                    raise df
+
+                if df.empty:
+                    st.warning(f"No data available for {indicator}")
+                    continue
+
+                st.markdown(f"### {indicator}")
+
+                col1, col2 = st.columns([3, 1])
+
+                color_col = "location" if df['location'].nunique() > 1 else None
+
+                with col1:
+                    plot_df = df[['year', 'value', 'location']].astype(
+                        {'value': 'float32'})
+
+                    if chart_type == "Line Chart":
+                        plot_df = downsample_traces(plot_df, by="location")
+                        fig = px.line(
+                            plot_df,
+                            x="year",
+                            y="value",
+                            color=color_col,
+                            markers=True,
+                            title=f"{indicator} Over Time",
+                            labels={"value": "Value", "year": "Year",
+                                    "location": "Location"},
+                            template="plotly_white"
                         )
+                    elif chart_type == "Bar Chart":
+                        fig = px.bar(
+                            plot_df,
+                            x="year",
+                            y="value",
+                            color=color_col,
+                            title=f"{indicator} Over Time",
+                            labels={"value": "Value", "year": "Year",
+                                    "location": "Location"},
+                            template="plotly_white"
+                        )
+                    elif chart_type == "Area Chart":
+                        fig = px.area(
+                            plot_df,
+                            x="year",
+                            y="value",
+                            color=color_col,
+                            title=f"{indicator} Over Time",
+                            labels={"value": "Value", "year": "Year",
+                                    "location": "Location"},
+                            template="plotly_white"
+                        )
+                    else:
+                        fig = px.scatter(
+                            plot_df,
+                            x="year",
+                            y="value",
+                            color=color_col,
+                            size="value",
+                            title=f"{indicator} Over Time",
+                            labels={"value": "Value", "year": "Year",
+                                    "location": "Location"},
+                            template="plotly_white"
+                        )
+
+                    fig.update_layout(
+                        xaxis=dict(showgrid=show_grid),
+                        yaxis=dict(showgrid=show_grid),
+                        legend=dict(orientation="h", yanchor="bottom",
+                                    y=1.02, xanchor="right", x=1),
+                        height=500,
+                    )
 
-                        if enable_animations:
-                            fig.update_layout(transition_duration=500)
+                    if enable_animations:
+                        fig.update_layout(transition_duration=500)
 
-                        st.plotly_chart(fig, use_container_width=True)
+                    st.plotly_chart(fig, use_container_width=True)
 
-                    with col2:
-                        st.subheader("Summary Statistics")
+                with col2:
+                    st.subheader("Summary Statistics")
 
-                        latest_year = df['year'].max(
-                        ) if not df.empty else "N/A"
-                        latest_value = df[df['year'] == latest_year]['value'].mean(
-                        ) if not df.empty else "N/A"
+                    latest_year, latest_value, first_value, last_value = summarize(
+                        df['year'].to_numpy(), df['value'].to_numpy(dtype=np.float64))
+                    latest_year, latest_value = int(latest_year), float(latest_value)
 
-                        st.metric(
-                            label="Latest Value",
-                            value=f"{latest_value:.2f}" if isinstance(
-                                latest_value, (int, float)) else latest_value,
-                            delta=None
-                        )
+                    st.metric(
+                        label="Latest Value",
+                        value=f"{latest_value:.2f}",
+                        delta=None
+                    )
 
-                        st.metric(
-                            label="Latest Year",
-                            value=latest_year,
-                            delta=None
-                        )
+                    st.metric(
+                        label="Latest Year",
+                        value=latest_year,
+                        delta=None
+                    )
 
-                        if not df.empty and len(df) > 1:
-                            first_value = df.iloc[0]['value'] if not df.empty else 0
-                            last_value = df.iloc[-1]['value'] if not df.empty else 0
-                            change = last_value - first_value
-                            change_pct = (change / first_value * 100) if first_value != 0 else 0  # noqa
+                    if len(df) > 1:
+                        change = last_value - first_value
+                        change_pct = (change / first_value * 100) if first_value != 0 else 0  # noqa
 
-                            delta_color = "normal" if change >= 0 else "inverse"
-                            st.metric(
-                                label="Overall Change",
-                                value=f"{change:.2f}",
-                                delta=f"{change_pct:.1f}%",
-                                delta_color=delta_color
-                            )
+                        delta_color = "normal" if change >= 0 else "inverse"
+                        st.metric(
+                            label="Overall Change",
+                            value=f"{change:.2f}",
+                            delta=f"{change_pct:.1f}%",
+                            delta_color=delta_color
+                        )
 
-                        with st.expander("View Raw Data"):
-                            st.dataframe(df, use_container_width=True)
+                    with st.expander("View Raw Data"):
+                        st.dataframe(df, use_container_width=True)
 
-                except Exception as e:
-                    st.error(f"Error processing {indicator}: {e}")
+            except Exception as e:
+                st.error(f"Error processing {indicator}: {e}")
 
     with tab2:
         if len(selected_indicators) > 1:
@@ -256,24 +297,38 @@ def fetch_and_visualize(selected_indicators):
 
                 all_data = []
                 for indicator in selected_indicators:
-                    df = un_population.get_data_for_indicator(
-                        indicator, locations=st.session_state.selected_locations)
-                    if not df.empty:
-                        df['indicator'] = indicator
-                        df['normalized_value'] = (df['value'] - df['value'].min()) / (df['value'].max(
-                        ) - df['value'].min()) if df['value'].max() != df['value'].min() else df['value']
-                        all_data.append(df)
+                    df = indicator_data[indicator]
+                    if isinstance(df, pd.DataFrame) and not df.empty:
+                        all_data.append(df.assign(indicator=indicator))
 
                 if all_data:
-                    combined_df = pd.concat(all_data)
+                    combined_df = pd.concat(
+                        all_data, ignore_index=True, sort=False)
+
+                    values = combined_df.groupby('indicator')['value']
+                    min_value = values.transform('min')
+                    max_value = values.transform('max')
+                    combined_df['normalized_value'] = np.where(
+                        max_value != min_value, (combined_df['value'] - min_value) / (max_value - min_value), combined_df['value']).astype('float32')
+
+                    if len(combined_df) > COMPARATIVE_MAX_ROWS:
+                        combined_df, step = bucket_by_year(
+                            combined_df, ['indicator', 'location'], COMPARATIVE_TARGET_ROWS,
+                            columns=('value', 'normalized_value'))
+                        st.caption(
+                            f"Large selection: showing averages over {step}-year buckets for each indicator and location.")
+                    facet_col = "location" if combined_df['location'].nunique(
+                    ) > 1 else None
+
+                    plot_df = downsample_traces(
+                        combined_df[['year', 'value', 'indicator', 'location']].astype({'value': 'float32'}), by=["indicator", "location"])
 
                     fig = px.line(
-                        combined_df,
+                        plot_df,
                         x="year",
                         y="value",
                         color="indicator",
-                        facet_col="location" if len(
-                            combined_df['location'].unique()) > 1 else None,
+                        facet_col=facet_col,
                         title="Comparison of Selected Indicators",
                         labels={"value": "Value", "year": "Year",
                                 "indicator": "Indicator"},
@@ -295,13 +350,15 @@ def fetch_and_visualize(selected_indicators):
 
                     st.subheader("Normalized Comparison (0-1 scale)")
 
+                    plot_df = downsample_traces(
+                        combined_df[['year', 'normalized_value', 'indicator', 'location']], y="normalized_value", by=["indicator", "location"])
+
                     fig2 = px.line(
-                        combined_df,
+                        plot_df,
                         x="year",
                         y="normalized_value",
                         color="indicator",
-                        facet_col="location" if len(
-                            combined_df['location'].unique()) > 1 else None,
+                        facet_col=facet_col,
                         title="Normalized Comparison of Selected Indicators",
                         labels={
                             "normalized_value": "Normalized Value (0-1)", "year": "Year", "indicator": "Indicator"},
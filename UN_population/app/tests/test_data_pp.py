@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+from data_pp import bucket_by_year, downsample_traces, lttb_indices, summarize
+
+
+def test_lttb_keeps_everything_when_under_budget():
+    x = np.arange(10.0)
+    np.testing.assert_array_equal(lttb_indices(x, x, 10), np.arange(10))
+    np.testing.assert_array_equal(lttb_indices(x, x, 50), np.arange(10))
+
+
+def test_lttb_returns_sorted_unique_indices_with_endpoints():
+    x = np.arange(10_000.0)
+    y = np.sin(x / 100)
+
+    idx = lttb_indices(x, y, 500)
+
+    assert len(idx) == 500
+    assert idx[0] == 0
+    assert idx[-1] == len(x) - 1
+    assert (np.diff(idx) > 0).all()
+
+
+def test_lttb_keeps_spikes():
+    x = np.arange(1000.0)
+    y = np.zeros_like(x)
+    y[[137, 612]] = [50.0, -80.0]
+
+    idx = lttb_indices(x, y, 20)
+
+    assert 137 in idx
+    assert 612 in idx
+
+
+def test_lttb_picks_largest_triangle_in_each_bucket():
+    x = np.arange(7.0)
+    y = np.array([0.0, 1.0, 5.0, 0.0, 0.0, 10.0, 0.0])
+
+    # Buckets [1, 3) and [3, 6): the peaks at 2 and 5 form the largest triangles
+    np.testing.assert_array_equal(lttb_indices(x, y, 4), [0, 2, 5, 6])
+
+
+def test_downsample_traces_caps_each_trace():
+    df = pd.DataFrame({
+        'year': np.tile(np.arange(3000), 2),
+        'value': np.random.default_rng(0).random(6000),
+        'location': np.repeat(['A', 'B'], 3000),
+    })
+
+    sampled = downsample_traces(df, by='location', max_points=100)
+
+    assert sampled.groupby('location').size().tolist() == [100, 100]
+    assert sampled.groupby('location')['year'].is_monotonic_increasing.all()
+
+
+def test_downsample_traces_skips_traces_with_repeated_x():
+    # Several rows per year and location, e.g. variants or age groups
+    df = pd.DataFrame({
+        'year': np.repeat(np.arange(1950, 2101), 30),
+        'value': np.random.default_rng(0).random(151 * 30),
+        'location': 'World',
+    })
+
+    assert downsample_traces(df, by='location', max_points=2000) is df
+
+
+def _series_frame(n_series, rows_per_year, years=np.arange(1950, 2101)):
+    rows = n_series * rows_per_year * len(years)
+    return pd.DataFrame({
+        'indicator': np.repeat([f'I{i}' for i in range(n_series)], rows_per_year * len(years)),
+        'location': 'World',
+        'year': np.tile(np.repeat(years, rows_per_year), n_series).astype('int16'),
+        'value': np.arange(rows, dtype=float),
+    })
+
+
+def test_bucket_by_year_keeps_full_resolution_when_series_fit():
+    # 60k rows, but only 4 series x 151 years: no need to widen buckets
+    df = _series_frame(n_series=4, rows_per_year=100)
+
+    bucketed, step = bucket_by_year(df, ['indicator', 'location'], 20_000)
+
+    assert step == 1
+    assert len(bucketed) == 4 * 151
+
+
+def test_bucket_by_year_targets_row_budget_across_series():
+    df = _series_frame(n_series=400, rows_per_year=1)
+
+    bucketed, step = bucket_by_year(df, ['indicator', 'location'], 20_000)
+
+    assert step == 4
+    assert len(bucketed) <= 20_000
+    assert bucketed.groupby(['indicator', 'location']).size().eq(38).all()
+
+
+def test_bucket_by_year_clamps_step_to_year_span():
+    df = _series_frame(n_series=50_000, rows_per_year=1, years=np.arange(2000, 2003))
+
+    bucketed, step = bucket_by_year(df, ['indicator', 'location'], 20_000)
+
+    assert step == 3
+    assert bucketed['year'].unique().tolist() == [2000]
+
+
+def test_summarize_matches_pandas_in_row_order():
+    df = pd.DataFrame({
+        'year': np.array([1950, 2000, 1975, 2000, 1990], dtype='int16'),
+        'value': [8091734930.0, 2.0, 3.0, np.nan, 5.0],
+    })
+
+    latest_year, latest_mean, first_value, last_value = summarize(
+        df['year'].to_numpy(), df['value'].to_numpy(dtype=np.float64))
+
+    assert latest_year == df['year'].max()
+    assert latest_mean == df.loc[df['year'] == latest_year, 'value'].mean()
+    assert first_value == 8091734930.0
+    assert last_value == 5.0
+
+
+def test_summarize_all_missing_latest_year_is_nan_without_warning(recwarn):
+    years = np.array([1950, 1960, 1960], dtype='int16')
+    values = np.array([1.0, np.nan, np.nan])
+
+    latest_year, latest_mean, _, _ = summarize(years, values)
+
+    assert latest_year == 1960
+    assert np.isnan(latest_mean)
+    assert len(recwarn) == 0
@@ -1,15 +1,52 @@
 import pandas as pd
 import numpy as np
 import os
+import tempfile
 from pathlib import Path
+import pyarrow as pa
+from pyarrow import csv
 
 parent_dir = Path(__file__).resolve().parent.parent
 data_dir = os.path.join(parent_dir, "data")
 
+ACCOUNT_ACTIVITY_SCHEMA = {
+    "CustomerID": pa.int32(),
+    "AccountBalance": pa.float64(),
+    "LastLogin": pa.date32(),
+}
+
 
 def load_data(file_path: str = data_dir + '/account_activity.csv') -> pd.DataFrame:
-    df = pd.read_csv(file_path)
+    # Parsed data is cached as Parquet next to the CSV and rebuilt when the CSV is newer
+    parquet_path = Path(file_path).with_suffix('.parquet')
+    if parquet_path.exists() and parquet_path.stat().st_mtime >= os.path.getmtime(file_path):
+        try:
+            return pd.read_parquet(parquet_path, engine='pyarrow', dtype_backend='pyarrow')
+        except (OSError, ValueError, pa.ArrowException) as e:
+            print(f"[WARNING] Ignoring unreadable Parquet cache {parquet_path}: {e}")
+
+    table = csv.read_csv(
+        file_path,
+        convert_options=csv.ConvertOptions(column_types=ACCOUNT_ACTIVITY_SCHEMA),
+    )
+    df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    _write_parquet_cache(df, parquet_path)
     return df
 
 
+def _write_parquet_cache(df: pd.DataFrame, parquet_path: Path) -> None:
+    # Written to a temp file and moved into place so readers never see a partial file
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            dir=parquet_path.parent, prefix=parquet_path.name + '.', suffix='.tmp')
+        os.close(fd)
+        df.to_parquet(tmp_path, engine='pyarrow', compression='zstd')
+        os.replace(tmp_path, parquet_path)
+    except OSError as e:
+        print(f"[WARNING] Could not write Parquet cache {parquet_path}: {e}")
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 # print(load_data().head())